@@ -20,6 +20,8 @@ class AppConfig:
         ]
         self.sec_obj = obj.SecurityRule
         self.nat_obj = obj.NatRule
+        # Compare very large object sets (5000+ of one type) across worker processes
+        self.parallel_compare = False
 
 class ConfigurationManager:
     def __init__(self):
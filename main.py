@@ -51,8 +51,8 @@ def initialize_api_session():
     session.authenticate()
     return session
 
-def setup_scm_object_manager(session, configure, obj_types, sec_obj, nat_obj, folder_scope):
-    return SCMObjectManager(session, folder_scope, configure, obj, obj_types, sec_obj, nat_obj)
+def setup_scm_object_manager(session, configure, obj_types, sec_obj, nat_obj, folder_scope, parallel_compare=False):
+    return SCMObjectManager(session, folder_scope, configure, obj, obj_types, sec_obj, nat_obj, parallel_compare=parallel_compare)
 
 def main(config): 
     try:
@@ -60,25 +60,25 @@ def main(config):
         logging.info(f"Script started at {time.ctime(start_time)}")
 
         api_session = PanApiHandler(initialize_api_session())
-        configure = Processor(api_session, config.max_workers, obj)
+        # Leaving the block shuts down the Processor's worker pools, even if a step fails
+        with Processor(api_session, config.max_workers, obj) as configure:
+            xml_file_path = get_xml_file_path(config, logger)
 
-        xml_file_path = get_xml_file_path(config, logger)
-
-        parse = XMLParser(xml_file_path, None)
-        folder_scope, config_type, device_group_name = parse.parse_config_and_set_scope(xml_file_path)
-        logger.info(f'Current SCM Folder: {folder_scope}, PANOS: {config_type}, Device Group: {device_group_name}')
+            parse = XMLParser(xml_file_path, None)
+            folder_scope, config_type, device_group_name = parse.parse_config_and_set_scope(xml_file_path)
+            logger.info(f'Current SCM Folder: {folder_scope}, PANOS: {config_type}, Device Group: {device_group_name}')
         
-        parse.config_type = config_type
-        parse.device_group_name = device_group_name
-        parsed_data = parse.parse_all()
-
-        scm_obj_manager = setup_scm_object_manager(api_session, configure, config.obj_types, config.sec_obj, config.nat_obj, folder_scope)
-        '''
-        Below three lines process Object, Security Rules and NAT rules. You can comment out a line to not run
-        '''
-        scm_obj_manager.process_objects(parsed_data, folder_scope, device_group_name, max_workers=6)
-        scm_obj_manager.process_security_rules(api_session, config.sec_obj, parsed_data, xml_file_path, limit=config.limit)
-        scm_obj_manager.process_nat_rules(api_session, config.nat_obj, parsed_data, xml_file_path, limit=config.limit)
+            parse.config_type = config_type
+            parse.device_group_name = device_group_name
+            parsed_data = parse.parse_all()
+
+            scm_obj_manager = setup_scm_object_manager(api_session, configure, config.obj_types, config.sec_obj, config.nat_obj, folder_scope, config.parallel_compare)
+            '''
+            Below three lines process Object, Security Rules and NAT rules. You can comment out a line to not run
+            '''
+            scm_obj_manager.process_objects(parsed_data, folder_scope, device_group_name, max_workers=6)
+            scm_obj_manager.process_security_rules(api_session, config.sec_obj, parsed_data, xml_file_path, limit=config.limit)
+            scm_obj_manager.process_nat_rules(api_session, config.nat_obj, parsed_data, xml_file_path, limit=config.limit)
 
         end_time = time.time()
         logger.info(f"Script execution time: {end_time - start_time:.2f} seconds")
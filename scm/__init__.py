@@ -20,32 +20,168 @@ CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 import logging
 import time
 import json
+import threading
+import functools
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+try:
+    # Optional C-accelerated JSON encoding/decoding for large payloads
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    try:
+        import msgspec
+        _json_loads = msgspec.json.decode
+        _json_dumps = msgspec.json.encode
+    except ImportError:
+        _json_loads = json.loads
+
+        def _json_dumps(obj):
+            return json.dumps(obj).encode('utf-8')
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+class JitteredRetry(Retry):
+    """ Retry whose backoff is randomised by +/-20% so parallel workers don't retry in lockstep. """
+
+    def get_backoff_time(self):
+        return super().get_backoff_time() * random.uniform(0.8, 1.2)
+
+@functools.lru_cache(maxsize=256)
+def _endpoint_path(endpoint):
+    """ Strip the trailing '?' carried by endpoint literals; requests builds the query string itself. """
+    return endpoint.rstrip('?')
 
 class PanApiHandler:
     BASE_URL = "https://api.sase.paloaltonetworks.com"
     # BASE_URL = "https://api.strata.paloaltonetworks.com"
+    POOL_CONNECTIONS = 32
+    POOL_MAXSIZE = 64
+    CACHE_MAX_ENTRIES = 1024
+    MAX_PAGE_SIZE = 5000  # Largest limit the API honours on a list request
 
     def __init__(self, session):
         self.session = session
+        self.pool_maxsize = self.POOL_MAXSIZE
+        self.mount_adapter(self.session)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def mount_adapter(cls, session, pool_maxsize=None):
+        """ Mount a pooled keep-alive adapter so every worker thread reuses TCP/TLS connections.
+
+        The adapter owns retries of connection errors and transient statuses (429/5xx); the
+        get/post/put methods default to a single attempt so the two layers don't multiply.
+        """
+        # Retry-After from a 429/503 takes precedence over the jittered backoff
+        retry = JitteredRetry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['GET', 'PUT', 'POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=cls.POOL_CONNECTIONS, pool_maxsize=pool_maxsize or cls.POOL_MAXSIZE, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # Advertise every content encoding urllib3 can decode here (br/zstd only when their packages are installed)
+        session.headers.update({
+            'Connection': 'keep-alive',
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+        })
+        return session
+
+    def ensure_session(self, pool_size):
+        """ Grow the connection pool so pool_size concurrent workers never discard a keep-alive connection. """
+        if pool_size > self.pool_maxsize:
+            self.pool_maxsize = pool_size
+            self.mount_adapter(self.session, pool_maxsize=pool_size)
 
     def ensure_valid_token(self):
         """ Ensure the session token is valid. """
         self.session.ensure_valid_token()
 
-    def get(self, endpoint, retries=1, delay=0.5, **kwargs):
-        """ Retrieve objects or a specific object from the API using GET method. """
+    def _cache_get(self, key):
+        """ Return the cached (expires, etag, payload) entry for key, or None. """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, payload, ttl, etag=None):
+        """ Store a payload for key, evicting the least recently used entry past the cap. """
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + ttl, etag, payload)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """ Drop every cached GET response, e.g. after the config has been changed. """
+        with self._cache_lock:
+            self._cache.clear()
+
+    def get(self, endpoint, retries=0, delay=0.5, cache_ttl=None, **kwargs):
+        """ Retrieve objects or a specific object from the API using GET method.
+
+        When cache_ttl is given, a response cached within that many seconds is returned
+        without hitting the API. Once it expires the request is made conditional on the
+        cached ETag, and the last cached response is reused if the API fails.
+        """
+        cache_key = (endpoint, tuple(sorted(kwargs.items())))
+        entry = self._cache_get(cache_key) if cache_ttl else None
+        if entry is not None and time.monotonic() < entry[0]:
+            logging.debug(f'Using cached items for {endpoint} {kwargs}')
+            return entry[2]
+
+        etag = entry[1] if entry is not None else None
+        status, body, new_etag = self._fetch(endpoint, retries, delay, kwargs, etag=etag)
+        if status == 304:
+            logging.debug(f'Items for {endpoint} {kwargs} not modified, reusing cached response')
+            self._cache_put(cache_key, entry[2], cache_ttl, etag)
+            return entry[2]
+        if body is not None:
+            data = body.get('data')
+            if cache_ttl:
+                self._cache_put(cache_key, data, cache_ttl, new_etag)
+            return data
+
+        stale = self._cache_get(cache_key) if cache_ttl else None
+        if stale is not None:
+            logging.warning(f'Failed to fetch {endpoint}, reusing last cached response')
+            return stale[2]
+        return None
+
+    def get_page(self, endpoint, retries=0, delay=0.5, **kwargs):
+        """ Retrieve one page from the API and return the full response body, including 'total'. """
+        return self._fetch(endpoint, retries, delay, kwargs)[1]
+
+    def _fetch(self, endpoint, retries, delay, params, etag=None):
+        """ Issue a GET and return (status_code, body, etag); (None, None, None) if every attempt fails. """
         self.ensure_valid_token()
 
-        # Constructing the URL with additional query parameters
-        query_params = '&'.join([f'{key}={value}' for key, value in kwargs.items()])
-        url = f"{self.BASE_URL}{endpoint}{query_params}"
-        logging.info(f'Fetching items: {url}')
+        # Query parameters are passed through to requests so they are encoded properly
+        url = f"{self.BASE_URL}{_endpoint_path(endpoint)}"
+        headers = {'If-None-Match': etag} if etag else None
+        logging.info(f'Fetching items: {url} {params}')
 
         for attempt in range(retries + 1):
             try:
-                response = self.session.get(url, timeout=10)
+                response = self.session.get(url, params=params, headers=headers, timeout=10)
+                if response.status_code == 304 and etag:
+                    return 304, None, etag
                 if response.status_code == 200:
-                    return response.json().get('data')
+                    logging.debug(f"Response for {url}: {len(response.content)} bytes, Content-Encoding: {response.headers.get('Content-Encoding')}")
+                    return 200, _json_loads(response.content), response.headers.get('ETag')
                 else:
                     logging.error(f"API Error: {response.json()}, Status Code: {response.status_code}")
                     if attempt < retries:
@@ -55,21 +191,57 @@ class PanApiHandler:
                 if attempt < retries:
                     time.sleep(delay)
 
-        return None
+        return None, None, None
+
+    def get_all(self, endpoint, page_size=200, max_workers=8, **kwargs):
+        """ Yield every object at an endpoint, page by page.
+
+        The first page is fetched on its own to learn the total and how many items the
+        server actually returns per page; the remaining pages are fetched concurrently and
+        yielded in order. Raises if any page cannot be fetched or the pages fall short of the
+        total, so a partial listing is never mistaken for a complete one.
+        """
+        page_size = min(page_size, self.MAX_PAGE_SIZE)
+        first = self.get_page(endpoint, limit=page_size, offset=0, **kwargs)
+        if first is None:
+            raise Exception(f"Failed to fetch {endpoint} at offset 0")
+        data = first.get('data') or []
+        yield from data
+
+        # Step by what the server returned, which may be less than the requested page size
+        step = len(data)
+        total = first.get('total', step)
+        fetched = step
+        if fetched < total:
+            if not step:
+                raise Exception(f"Fetched 0 of {total} items from {endpoint}")
+            offsets = range(step, total, step)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+                pages = executor.map(lambda offset: self.get_page(endpoint, limit=step, offset=offset, **kwargs), offsets)
+                for offset, page in zip(offsets, pages):
+                    if page is None:
+                        raise Exception(f"Failed to fetch {endpoint} at offset {offset}")
+                    data = page.get('data') or []
+                    fetched += len(data)
+                    yield from data
+        if fetched < total:
+            raise Exception(f"Fetched {fetched} of {total} items from {endpoint}")
 
-    def post(self, endpoint, item_data, retries=2, delay=0.5):
+    def post(self, endpoint, item_data, retries=0, delay=0.5, headers=None):
         """ Create or update an object via the API. """
         url = f"{self.BASE_URL}{endpoint}"
+        headers = {**JSON_HEADERS, **headers} if headers else JSON_HEADERS
         for attempt in range(retries + 1):
             try:
                 self.ensure_valid_token()
-                response = self.session.post(url, json=item_data, timeout=10)
+                response = self.session.post(url, data=_json_dumps(item_data), headers=headers, timeout=10)
                 if response.status_code in [200, 201]:
                     # Object created or updated successfully
+                    self.clear_cache()
                     return {'status': 'success', 'message': 'Object processed', 'name': item_data.get('name')}
                 else:
                     # Handle API error responses
-                    error_response = response.json()
+                    error_response = _json_loads(response.content)
                     if response.status_code == 400 and "object already exists" in str(error_response).lower():
                         logging.info(f"Object already exists for '{item_data.get('name', '')}'")
                         return {'status': 'exists', 'name': item_data.get('name'), 'response': error_response}
@@ -89,17 +261,18 @@ class PanApiHandler:
 
         return {'status': 'failed', 'message': 'Failed after retries', 'name': item_data.get('name')}
 
-    def put(self, endpoint, item_data, retries=2, delay=0.5):
+    def put(self, endpoint, item_data, retries=0, delay=0.5):
         """ Update an object via the API. """
         url = f"{self.BASE_URL}{endpoint}"
         for attempt in range(retries + 1):
             try:
                 self.ensure_valid_token()
-                response = self.session.put(url, json=item_data, timeout=10)
+                response = self.session.put(url, data=_json_dumps(item_data), headers=JSON_HEADERS, timeout=10)
                 if response.status_code in [200, 204]:
+                    self.clear_cache()
                     return {'status': 'success', 'message': 'Object updated', 'name': item_data.get('name')}
                 else:
-                    error_response = response.json()
+                    error_response = _json_loads(response.content)
                     logging.error(f"API Error for '{item_data.get('name', '')}': {error_response}, Status Code: {response.status_code}")
                     if attempt < retries:
                         time.sleep(delay)
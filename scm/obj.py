@@ -21,11 +21,32 @@ ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
 OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 '''
 
-from scm import PanApiHandler
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+import tempfile
+from urllib.parse import quote, urlparse
+
+# Where on-disk snapshots of predefined catalogs (e.g. URL filtering categories) are kept
+SNAPSHOT_DIR = '~/.panapi/cache'
 
 class PanApiHandler:
     """Base class for Pan objects."""
     _endpoint = None  # Default endpoint
+    _cache_ttl = 30.0  # Seconds a GET response for this object type may be served from cache
+    _registry = {}  # Object types with an endpoint, keyed by class name in definition order
+    _snapshot = None  # Snapshot file prefix for predefined catalogs served from disk
+    _snapshot_ttl = 86400  # Seconds before a catalog snapshot is refreshed from the API
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls._endpoint:
+            # Endpoints are used as cache keys on every fetch, so share a single string object
+            cls._endpoint = sys.intern(cls._endpoint)
+            PanApiHandler._registry[cls.__name__] = cls
 
     @classmethod
     def get_endpoint(cls):
@@ -34,11 +55,81 @@ class PanApiHandler:
             raise NotImplementedError("Endpoint not defined for this object type")
         return cls._endpoint
 
+    @classmethod
+    def list(cls, api_handler, folder_scope, limit='', position=''):
+        """List the objects of this type in a folder."""
+        if cls._snapshot:
+            return cls._list_from_snapshot(api_handler, folder_scope, limit, position)
+        return api_handler.get(cls.get_endpoint(), cache_ttl=cls._cache_ttl, limit=limit, position=position, folder=folder_scope)
+
+    @classmethod
+    def _snapshot_path(cls, api_handler, folder_scope, limit):
+        """Return the snapshot file for this catalog, tenant, folder and limit."""
+        host = urlparse(api_handler.BASE_URL).netloc
+        tenant = getattr(api_handler.session, 'tsg_id', None) or 'default'
+        name = f"{cls._snapshot}-{quote(str(folder_scope), safe='')}-{limit or 'all'}.json.gz"
+        return os.path.join(os.path.expanduser(SNAPSHOT_DIR), host, quote(str(tenant), safe=''), name)
+
+    @classmethod
+    def _read_snapshot(cls, path):
+        """Load a snapshot file, or return None if it is missing or unreadable."""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def _list_from_snapshot(cls, api_handler, folder_scope, limit, position):
+        """Serve the catalog from its snapshot, refreshing it from the API once it is too old."""
+        path = cls._snapshot_path(api_handler, folder_scope, limit)
+        try:
+            fresh = time.time() - os.path.getmtime(path) < cls._snapshot_ttl
+        except OSError:
+            fresh = False
+        if fresh:
+            data = cls._read_snapshot(path)
+            if data is not None:
+                return data
+        data = cls.refresh(api_handler, folder_scope, limit, position)
+        if data is None and not fresh:
+            data = cls._read_snapshot(path)
+            if data is not None:
+                logging.warning(f"Could not refresh {cls._snapshot} from the API, using expired snapshot {path}")
+        return data
+
+    @classmethod
+    def refresh(cls, api_handler, folder_scope, limit='', position=''):
+        """Fetch the catalog from the API and atomically rewrite its snapshot."""
+        data = api_handler.get(cls.get_endpoint(), cache_ttl=cls._cache_ttl, limit=limit, position=position, folder=folder_scope)
+        if data is None:
+            return None
+        path = cls._snapshot_path(api_handler, folder_scope, limit)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write snapshot {path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return data
+
+    @classmethod
+    def iter_all(cls, api_handler, folder_scope, page_size=200, position=''):
+        """Yield every object of this type in a folder, fetching pages concurrently."""
+        return api_handler.get_all(cls.get_endpoint(), page_size=page_size, position=position, folder=folder_scope)
+
 class SecurityRule(PanApiHandler):
     _endpoint = "/sse/config/v1/security-rules?"
+    _cache_ttl = 5
 
 class NatRule(PanApiHandler):
     _endpoint = "/config/network/v1/nat-rules?"
+    _cache_ttl = 5
 
 class Address(PanApiHandler):
     "An address object"
@@ -59,6 +150,7 @@ class ServiceGroup(PanApiHandler):
 class Application(PanApiHandler):
     "An application object"
     _endpoint = "/sse/config/v1/applications?"
+    _cache_ttl = 300
 
 class ApplicationFilter(PanApiHandler):
     "An application filter"
@@ -103,6 +195,7 @@ class HipProfile(PanApiHandler):
 class Region(PanApiHandler):
     "A region"
     _endpoint = "/sse/config/v1/regions?"
+    _cache_ttl = 300
 
 class Schedule(PanApiHandler):
     "A schedule"
@@ -119,6 +212,8 @@ class URLCategory(PanApiHandler):
 class URLFilteringCategory(PanApiHandler):
     "A predefined URL category"
     _endpoint = "/sse/config/v1/url-filtering-categories?"
+    _snapshot = "url-filtering-categories"
+    _cache_ttl = 300
 
 class AntiSpywareProfile(PanApiHandler):
     "An anti-spyware profile"
@@ -127,6 +222,7 @@ class AntiSpywareProfile(PanApiHandler):
 class AntiSpywareSignature(PanApiHandler):
     "An anti-spyware signature"
     _endpoint = "/sse/config/v1/anti-spyware-signature"
+    _cache_ttl = 300
 
 class DNSSecurityProfile(PanApiHandler):
     "A DNS security profile"
@@ -143,6 +239,7 @@ class DecryptionProfile(PanApiHandler):
 class DecryptionRule(PanApiHandler):
     "A decryption rule"
     _endpoint = "/sse/config/v1/decryption-rules?"
+    _cache_ttl = 5
 
 class FileBlockingProfile(PanApiHandler):
     "A file blocking profile"
@@ -167,7 +264,8 @@ class VulnerabilityProtectionProfile(PanApiHandler):
 class VulnerabilityProtectionSignature(PanApiHandler):
     "A vulnerability protection signature"
     _endpoint = "/sse/config/v1/vulnerability-protection-signatures?"
+    _cache_ttl = 300
 
 class WildFireAntivirusProfile(PanApiHandler):
     "A WildFire antivirus profile"
-    _endpoint = "/sse/config/v1/wildfire-anti-virus-profiles?"
\ No newline at end of file
+    _endpoint = "/sse/config/v1/wildfire-anti-virus-profiles?"
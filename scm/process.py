@@ -1,8 +1,122 @@
+import os
 import logging
+import logging.handlers
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+import bisect
+import functools
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import deque
 from typing import Any, List, Tuple, Dict
 
+@functools.lru_cache(maxsize=None)
+def _endpoint_of(obj_type) -> str:
+    """
+    Return the object type's endpoint, resolved once per type.
+    """
+    return obj_type.get_endpoint()
+
+@functools.lru_cache(maxsize=None)
+def _clean_endpoint(obj_type) -> str:
+    """
+    Return the object type's endpoint without the trailing '?', for building /<id> paths.
+    """
+    return _endpoint_of(obj_type).replace('?', '')
+
+@functools.lru_cache(maxsize=None)
+def _endpoint_message(obj_type) -> str:
+    """
+    Return the short resource name used in log messages, e.g. 'addresses'.
+    """
+    return _clean_endpoint(obj_type).replace('/sse/config/v1/', '')
+
+def _folder_rules(all_rules, folder_scope) -> List[Dict[str, Any]]:
+    """
+    Keep only the rules that live in folder_scope, dropping inherited ones.
+    """
+    return [rule for rule in all_rules or [] if rule['folder'] == folder_scope]
+
+def _deep_differs(value1, value2) -> bool:
+    """
+    Check whether an SCM value differs from the existing value.
+
+    Only keys present in value1 are compared, and an empty list is treated as equal to None.
+    Walks nested dicts and lists with an explicit stack and stops at the first difference.
+
+    Args:
+        value1: Value from the parsed configuration.
+        value2: Value currently in SCM.
+
+    Returns:
+        bool: True if a difference was found, False otherwise.
+    """
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    stack = deque([(value1, value2)])
+    while stack:
+        value1, value2 = stack.pop()
+        if value1 is None or value2 is None:
+            # None matches None or an empty list; anything else is a change
+            if value1 == value2 or value1 == [] or value2 == []:
+                continue
+            return True
+        if isinstance(value1, dict) and isinstance(value2, dict):
+            for key in value1:
+                if key not in value2:
+                    if debug:
+                        logging.debug("Key '%s' found in SCM object but not in existing object.", key)
+                    return True
+                stack.append((value1[key], value2[key]))
+        elif isinstance(value1, list) and isinstance(value2, list):
+            if len(value1) != len(value2):
+                if debug:
+                    logging.debug("Difference detected in list length. SCM: %s, Existing: %s", len(value1), len(value2))
+                return True
+            for item1, item2 in zip(value1, value2):
+                if isinstance(item1, dict) and isinstance(item2, dict):
+                    stack.append((item1, item2))
+                elif item1 != item2:
+                    if debug:
+                        logging.debug("Difference detected in list item. SCM: %s, Existing: %s", item1, item2)
+                    return True
+        elif value1 != value2:
+            if debug:
+                logging.debug("Difference detected in value. SCM: %s, Existing: %s", value1, value2)
+            return True
+    return False
+
+def _diff_entries(parsed_objects, current_by_name):
+    """
+    Split parsed objects into new objects and existing objects that need an update.
+
+    Lives at module level so it can also run in a worker process.
+
+    Args:
+        parsed_objects: Parsed objects of one type.
+        current_by_name: Current SCM objects of that type keyed by name.
+
+    Returns:
+        Tuple of new objects and updated objects; updated objects carry the existing id.
+    """
+    new, updated = [], []
+    for parsed_obj in parsed_objects:
+        existing_obj = current_by_name.get(parsed_obj['name'])
+        if existing_obj is None:
+            new.append(parsed_obj)
+        # The id always matches the existing object, so it is only attached once an update is needed
+        elif SCMObjectManager.needs_update(parsed_obj, existing_obj):
+            updated.append({**parsed_obj, 'id': existing_obj.get('id')})
+    return new, updated
+
+def _init_compare_worker(log_queue, level):
+    """
+    Send a compare worker's log records back to the parent, which has the configured handlers.
+    """
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
 class Processor:
     def __init__(self, api_handler, max_workers: int, obj_module):
         """
@@ -17,6 +131,39 @@ class Processor:
         self.max_workers = max_workers
         self.obj = obj_module
         self.logger = logging.getLogger(__name__)
+        self.api_handler.ensure_session(max_workers)
+        self._executors = {}
+        self._executors_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_executor(self, max_workers: int = None) -> ThreadPoolExecutor:
+        """
+        Return the long-lived thread pool for a worker count, creating it on first use.
+
+        Args:
+            max_workers: Number of workers; defaults to the current max_workers.
+        """
+        max_workers = max_workers or self.max_workers
+        with self._executors_lock:
+            executor = self._executors.get(max_workers)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scm-worker')
+                self._executors[max_workers] = executor
+            return executor
+
+    def close(self):
+        """
+        Shut down every thread pool owned by the Processor.
+        """
+        with self._executors_lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=True)
 
     def set_max_workers(self, new_max_workers: int):
         """
@@ -26,6 +173,7 @@ class Processor:
             new_max_workers: New maximum number of workers.
         """
         self.max_workers = new_max_workers
+        self.api_handler.ensure_session(new_max_workers)
 
     def post_entries(self, folder_scope, entries: List[Any], obj_type, extra_query_params: str) -> Tuple[int, int, int]:
         """
@@ -46,11 +194,11 @@ class Processor:
 
         start_time = time.time()
         initial_entry_count = len(entries)
-        endpoint_message = obj_type.get_endpoint().replace('/sse/config/v1/','').replace('?','')
+        endpoint_message = _endpoint_message(obj_type)
 
         self.logger.info(f"Processing {len(entries)} {endpoint_message} entries in parallel.")
 
-        endpoint = obj_type.get_endpoint() + extra_query_params
+        endpoint = _endpoint_of(obj_type) + extra_query_params
         results = self.create_objects(folder_scope, 0, endpoint, entries)
         
         created_count, exists_count, error_count, error_objects = self.analyze_results(results)
@@ -74,19 +222,31 @@ class Processor:
         """
         self.logger.info(f'Running with {self.max_workers} workers.')
         endpoint = f"{endpoint}&folder={scope}"
-        results = []
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(self.api_handler.post, endpoint, item_data, retries=2, delay=0.5) for item_data in data[start_index:]]
-            for future in as_completed(futures):
-                try:
-                    response = future.result()
-                    results.append(response)
-                    self.logger.info(response)
-                except Exception as e:
-                    self.logger.error(f"Error processing object: {e}", exc_info=True)
 
-        return results
+        executor = self.get_executor()
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        log_debug, log_error = self.logger.debug, self.logger.error
+        # Bind the endpoint shared by every create once; transient failures are retried by the session adapter
+        post_fn = functools.partial(self.api_handler.post, endpoint)
+        # A fresh key per item, reused on that item's retries, so the server can skip repeated creates
+        # without ever merging two legitimate creates of the same payload (other folder, or re-created later)
+        futures = {
+            executor.submit(post_fn, item_data, headers={'Idempotency-Key': str(uuid.uuid4())}): i
+            for i, item_data in enumerate(data[start_index:])
+        }
+        # Slot per submitted item, so results come back in submission order
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            try:
+                response = future.result()
+                results[futures[future]] = response
+                # Individual results are summarised by log_summary; only log them when debugging
+                if debug:
+                    log_debug("Post result: %s", response)
+            except Exception as e:
+                log_error("Error processing object: %s", e)
+
+        return [result for result in results if result is not None]
 
     def analyze_results(self, results: List[Dict[str, Any]]) -> Tuple[int, int, int, List[str]]:
         """
@@ -100,17 +260,18 @@ class Processor:
         """
         created_count, exists_count, error_count = 0, 0, 0
         error_objects = []
+        error_objects_append = error_objects.append
 
         for result in results:
-            if 'status' in result and 'message' in result and 'name' in result:
-                if result['status'] == 'success':
-                    if result['message'] == 'Object processed':
-                        created_count += 1
-                    else:
-                        exists_count += 1
-                elif result['status'] == 'error creating object':
-                    error_count += 1
-                    error_objects.append(result['name'])
+            status = result.get('status')
+            if status == 'success':
+                if result.get('message') == 'Object processed':
+                    created_count += 1
+                else:
+                    exists_count += 1
+            elif status == 'error creating object':
+                error_count += 1
+                error_objects_append(result.get('name'))
 
         return created_count, exists_count, error_count, error_objects
 
@@ -143,9 +304,27 @@ class Processor:
         # Use logger.info to ensure this message is shown in the console
         self.logger.info(summary_message)
 
-    def reorder_rules(self, obj_type, endpoint, folder_scope, original_rules, current_rules, limit, position):
+    def fetch_folder_rules(self, obj_type, folder_scope, limit, position) -> List[Dict[str, Any]]:
         """
-        Reorder rules based on a specified desired order.
+        Fetch every rule of a rulebase in folder_scope, paging past the API's page cap.
+        Args:
+            obj_type: Type of the object to process.
+            folder_scope: Scope within which the rules are processed.
+            limit: Page size for API requests.
+            position: Position in the rulebase.
+        Returns:
+            List of rules in the folder, or an empty list if the rulebase could not be fetched.
+        """
+        try:
+            all_rules = list(self.api_handler.get_all(_endpoint_of(obj_type), page_size=int(limit or 200), folder=folder_scope, position=position))
+        except Exception as e:
+            self.logger.error(f"Error fetching {position} rules for {folder_scope}: {e}")
+            return []
+        return _folder_rules(all_rules, folder_scope)
+
+    def reorder_rules(self, obj_type, endpoint, folder_scope, original_rules, current_rules, limit, position) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Reorder rules based on a specified desired order, using the fewest moves from plan_moves.
         Args:
             obj_type: Type of the object to process.
             endpoint: API endpoint for rule manipulation.
@@ -155,47 +334,37 @@ class Processor:
             limit: Limit for API requests.
             position: Position in the rulebase for ordering.
         Returns:
-            Boolean indicating if any moves were made.
+            A tuple of whether any moves were made and the current rules as last fetched.
         """
         current_rule_ids = {rule['name']: rule['id'] for rule in current_rules}
-        current_order = [rule['name'] for rule in current_rules]
-        desired_order = [rule['name'] for rule in original_rules if rule['name'] in current_rule_ids]
-
-        max_attempts = 8
-        attempts = 0
-
-        while current_order != desired_order and attempts < max_attempts:
-            attempts += 1
-            moves = []
-
-            for i, rule_name in enumerate(desired_order[:-1]):
-                if current_order.index(rule_name) > current_order.index(desired_order[i + 1]):
-                    rule_id = current_rule_ids[rule_name]
-                    destination_rule_id = current_rule_ids[desired_order[i + 1]]
-                    move_data = {
-                        "destination": "before",
-                        "rulebase": position,
-                        "destination_rule": destination_rule_id
-                    }
-                    moves.append((f"{endpoint}/{rule_id}:move", move_data))
-                    self.logger.info(f"Prepared move: Rule '{rule_name}' (ID: {rule_id}) before '{desired_order[i + 1]}' (ID: {destination_rule_id})")
-
-            if not moves:
-                break  # Exit loop if no moves are required
-
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                self.logger.info(f'Currently utilizing {self.max_workers} workers.')
-                futures = [executor.submit(self.api_handler.post, endpoint, move_data) for endpoint, move_data in moves]
-                for future in futures:
-                    response = future.result()
-                    if response['status'] != 'success':
-                        logging.error(f"Error moving rule: {response}")
-                        # Handle the error appropriately
-
-            # Refetch the rules to update the current order
-            all_current_rules = self.api_handler.get(obj_type.get_endpoint(), folder=folder_scope, limit=limit, position=position)
-            current_rules = [rule for rule in all_current_rules if rule['folder'] == folder_scope]
-            current_order = [rule['name'] for rule in current_rules if rule['name'] != 'default']
+        current_order = [rule['name'] for rule in current_rules if rule['name'] != 'default']
+        desired_order = [rule['name'] for rule in original_rules if rule['name'] != 'default']
+
+        moves = self.plan_moves(current_order, desired_order)
+        if not moves:
+            return False, current_rules
+
+        self.logger.info(f"Reordering {len(current_order)} rules with {len(moves)} moves.")
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        # Only the destination and the rules involved change between moves
+        move_template = {"rulebase": position}
+        move_url = endpoint + "/%s:move"
+        for rule_name, destination, destination_rule in moves:
+            rule_id = current_rule_ids[rule_name]
+            destination_rule_id = current_rule_ids[destination_rule]
+            move_data = move_template.copy()
+            move_data["destination"] = destination
+            move_data["destination_rule"] = destination_rule_id
+            if debug:
+                self.logger.debug("Moving rule '%s' (ID: %s) %s '%s' (ID: %s)", rule_name, rule_id, destination, destination_rule, destination_rule_id)
+            # Each move is relative to the result of the previous one, so they cannot run in parallel
+            response = self.api_handler.post(move_url % rule_id, move_data)
+            if response['status'] != 'success':
+                self.logger.error(f"Error moving rule '{rule_name}': {response}")
+
+        # Refetch the rules to check the result; the caller reuses them instead of fetching again
+        current_rules = self.fetch_folder_rules(obj_type, folder_scope, limit, position)
+        return True, current_rules
 
     def check_and_reorder_rules(self, obj_type, folder_scope, original_rules, limit, position):
         """
@@ -207,32 +376,79 @@ class Processor:
             limit: Limit for API requests.
             position: Position in the rulebase for ordering.
         """
-        rules_in_correct_order = False
+        max_rounds = 5
         start_time_reordering = time.time()
+        endpoint = _clean_endpoint(obj_type)
 
-        while not rules_in_correct_order:
-            # Fetch current rules from SCM
-            # endpoint = self.obj.SecurityRule.get_endpoint()
-            endpoint = obj_type.get_endpoint()
-            all_current_rules = self.api_handler.get(obj_type.get_endpoint(), folder=folder_scope, limit=limit, position=position)
-            endpoint = endpoint.replace('?','')
-            current_rules = [rule for rule in all_current_rules if rule['folder'] == folder_scope]
-            current_order = [rule['name'] for rule in current_rules if rule['name'] != 'default']
+        # Determine the desired order of rules
+        desired_order = [rule['name'] for rule in original_rules if rule['name'] != 'default']
 
-            # Determine the desired order of rules
-            desired_order = [rule['name'] for rule in original_rules if rule['name'] != 'default']
+        # Fetch current rules from SCM once; later rounds reuse the rules reorder_rules refetched
+        current_rules = self.fetch_folder_rules(obj_type, folder_scope, limit, position)
+
+        for _ in range(max_rounds):
+            current_order = [rule['name'] for rule in current_rules if rule['name'] != 'default']
 
             # Check if reordering is needed
-            if current_order != desired_order:
-                self.logger.info("Reordering rules now..")
-                moves_made = self.reorder_rules(obj_type, endpoint, folder_scope, original_rules, current_rules, limit, position)
-                rules_in_correct_order = not moves_made
-            else:
-                rules_in_correct_order = True
+            if current_order == desired_order:
+                break
+            self.logger.info("Reordering rules now..")
+            moves_made, current_rules = self.reorder_rules(obj_type, endpoint, folder_scope, original_rules, current_rules, limit, position)
+            if not moves_made:
+                break
+        else:
+            if [rule['name'] for rule in current_rules if rule['name'] != 'default'] != desired_order:
+                self.logger.warning(f"Rules in {folder_scope} still out of order after {max_rounds} reordering rounds")
 
         end_time_reordering = time.time()
         self.logger.info(f"Time taken for reordering rules: {end_time_reordering - start_time_reordering:.2f} seconds")
 
+    @staticmethod
+    def plan_moves(current_order: List[str], desired_order: List[str]) -> List[Tuple[str, str, str]]:
+        """
+        Plan the fewest rule moves that turn current_order into desired_order.
+
+        Rules on the longest run already in the desired relative order stay where they are.
+        Every other rule is moved after its predecessor in the desired order, or before the
+        first rule that stays put if it has no predecessor. Moves must be applied in order.
+        Args:
+            current_order: Rule names in their current order.
+            desired_order: Rule names in the desired order.
+        Returns:
+            List of (rule_name, destination, destination_rule_name) tuples.
+        """
+        current_pos = {name: i for i, name in enumerate(current_order)}
+        desired_order = [name for name in desired_order if name in current_pos]
+        positions = [current_pos[name] for name in desired_order]
+
+        # Longest increasing subsequence of current positions, tracked by index into desired_order
+        tails, tail_indices, previous = [], [], [None] * len(positions)
+        for i, pos in enumerate(positions):
+            j = bisect.bisect_left(tails, pos)
+            if j:
+                previous[i] = tail_indices[j - 1]
+            if j == len(tails):
+                tails.append(pos)
+                tail_indices.append(i)
+            else:
+                tails[j] = pos
+                tail_indices[j] = i
+        keep = set()
+        i = tail_indices[-1] if tail_indices else None
+        while i is not None:
+            keep.add(i)
+            i = previous[i]
+
+        moves = []
+        for i, name in enumerate(desired_order):
+            if i in keep:
+                continue
+            if i == 0:
+                moves.append((name, "before", desired_order[min(keep)]))
+            else:
+                moves.append((name, "after", desired_order[i - 1]))
+        return moves
+
 class RuleProcessor:
     @staticmethod
     def is_rule_order_correct(current_rules, desired_rules):
@@ -249,7 +465,10 @@ class RuleProcessor:
         return current_rule_names == desired_rule_names
 
 class SCMObjectManager:
-    def __init__(self, api_handler, folder_scope, configure, obj_module, obj_types, sec_obj, nat_obj):
+    # Object counts above which the parallel compare, when enabled, is worth its pickling cost
+    PARALLEL_COMPARE_THRESHOLD = 5000
+
+    def __init__(self, api_handler, folder_scope, configure, obj_module, obj_types, sec_obj, nat_obj, parallel_compare=False):
         """
         Initialize SCMObjectManager with necessary handlers and configurations.
 
@@ -260,6 +479,7 @@ class SCMObjectManager:
             obj_module: Module for handling object-related operations.
             obj_types: Types of objects to be managed.
             sec_obj: Security object type for rule processing.
+            parallel_compare: Compare very large object sets across worker processes.
         """
         self.api_handler = api_handler
         self.folder_scope = folder_scope
@@ -268,19 +488,38 @@ class SCMObjectManager:
         self.obj_types = obj_types
         self.sec_obj = sec_obj
         self.nat_obj = nat_obj        
+        self.parallel_compare = parallel_compare
         self.logger = logging.getLogger(__name__)
 
     def fetch_objects(self, obj_type, limit='10000', position=''):
-        endpoint = obj_type._endpoint
-        all_objects = self.api_handler.get(endpoint, limit=limit, position=position, folder=self.folder_scope)
+        if obj_type._snapshot:
+            all_objects = obj_type.list(self.api_handler, self.folder_scope, limit, position)
+        else:
+            # Page past the limit so a folder holding more objects than one page is listed completely
+            all_objects = list(obj_type.iter_all(self.api_handler, self.folder_scope, page_size=int(limit or 200), position=position))
         self.logger.debug(f'All Objects Fetched: {all_objects}')
         return all_objects
 
     def fetch_rules(self, obj_type, limit='10000', position=''):
-        endpoint = obj_type._endpoint
-        all_objects = self.api_handler.get(endpoint, limit=limit, position=position, folder=self.folder_scope)
+        all_objects = list(obj_type.iter_all(self.api_handler, self.folder_scope, page_size=int(limit or 200), position=position))
         return [o for o in all_objects if 'name' in o and 'folder' in o]
 
+    def fetch_pre_and_post_rules(self, obj_type, limit='10000'):
+        """
+        Fetch the pre and post rulebases concurrently.
+
+        Args:
+            obj_type: Rule object type to fetch.
+            limit: Limit for fetching rules.
+
+        Returns:
+            Tuple of pre and post rule lists.
+        """
+        executor = self.configure.get_executor(2)
+        pre_future = executor.submit(self.fetch_rules, obj_type, limit, position='pre')
+        post_future = executor.submit(self.fetch_rules, obj_type, limit, position='post')
+        return pre_future.result(), post_future.result()
+
     def process_objects(self, parsed_data, folder_scope, device_group_name, max_workers=6, limit='10000'):
         """
         Process objects based on parsed data, updating or creating new entries as needed.
@@ -302,22 +541,39 @@ class SCMObjectManager:
         self.update_existing_entries(updated_entries, folder_scope, device_group_name)
 
     def get_current_objects(self, obj_types, max_workers=6, limit='10000', **kwargs):
+        # No point starting more threads than there are endpoints to fetch
+        max_workers = max(1, min(max_workers, len(obj_types)))
         logging.info(f"Running with {max_workers} workers.")
         results = {}
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_obj_type = {
-                executor.submit(self.fetch_objects, obj_type, limit, **kwargs.get(obj_type.__name__, {})): obj_type 
-                for obj_type in obj_types
-            }
-            for future in as_completed(future_to_obj_type):
-                obj_type = future_to_obj_type[future]
-                try:
-                    data = future.result()
-                    logging.debug(f"Data fetched for {obj_type.__name__}: {data}")
-                    results[obj_type] = data  # Store the entire fetched object data
-                except Exception as exc:
-                    logging.error(f'Exception fetching data for {obj_type.__name__}: {exc}')
-            return results
+        executor = self.configure.get_executor(max_workers)
+        future_to_obj_type = {
+            executor.submit(self.fetch_objects, obj_type, limit, **kwargs.get(obj_type.__name__, {})): obj_type 
+            for obj_type in obj_types
+        }
+        for future in as_completed(future_to_obj_type):
+            obj_type = future_to_obj_type[future]
+            try:
+                data = future.result()
+                logging.debug(f"Data fetched for {obj_type.__name__}: {data}")
+                results[obj_type] = data  # Store the entire fetched object data
+            except Exception as exc:
+                logging.error(f'Exception fetching data for {obj_type.__name__}: {exc}')
+        return results
+
+    def dump_folder(self, max_workers=6, limit='10000'):
+        """
+        Fetch every object type that has an endpoint from the folder in one concurrent batch.
+
+        Args:
+            max_workers: Number of workers for parallel fetching.
+            limit: Limit for fetching objects.
+
+        Returns:
+            dict: Fetched objects keyed by object type name.
+        """
+        obj_types = list(self.obj.PanApiHandler._registry.values())
+        current_objects = self.get_current_objects(obj_types, max_workers=max_workers, limit=limit)
+        return {obj_type.__name__: data for obj_type, data in current_objects.items()}
 
     def get_new_and_updated_entries(self, parsed_data, current_objects):
         """
@@ -337,24 +593,60 @@ class SCMObjectManager:
             parsed_data_key = self._generate_key_name(entry_type_name)
             if parsed_data_key in parsed_data:
                 current_set = current_objects[obj_type]
-                current_names = set(o['name'] for o in current_set if isinstance(o, dict))
+                current_by_name = {o['name']: o for o in current_set if isinstance(o, dict)}
                 self.logger.debug(f"Current set for {entry_type_name}: {current_set}")
                 self.logger.debug(f"Parsed data for {entry_type_name}: {parsed_data[parsed_data_key]}")
-                for parsed_obj in parsed_data[parsed_data_key]:
-                    name = parsed_obj['name']
-                    if name not in current_names:
-                        self.logger.debug(f"New object found for {name} in {entry_type_name}")
-                        new_entries.setdefault(entry_type_name, []).append(parsed_obj)
-                    else:
-                        existing_obj = next(o for o in current_set if o['name'] == name)
-                        parsed_obj_with_id = {**parsed_obj, 'id': existing_obj.get('id')}
-                        if self.needs_update(parsed_obj_with_id, existing_obj):
-                            self.logger.info(f"Update needed for {entry_type_name}: {name}")
-                            updated_entries.setdefault(entry_type_name, []).append(parsed_obj_with_id)
+                parsed_objects = parsed_data[parsed_data_key]
+                if self.parallel_compare and len(parsed_objects) > self.PARALLEL_COMPARE_THRESHOLD:
+                    new, updated = self._diff_entries_parallel(parsed_objects, current_by_name)
+                else:
+                    new, updated = _diff_entries(parsed_objects, current_by_name)
+                for parsed_obj in new:
+                    self.logger.debug(f"New object found for {parsed_obj['name']} in {entry_type_name}")
+                for parsed_obj in updated:
+                    self.logger.info(f"Update needed for {entry_type_name}: {parsed_obj['name']}")
+                if new:
+                    new_entries.setdefault(entry_type_name, []).extend(new)
+                if updated:
+                    updated_entries.setdefault(entry_type_name, []).extend(updated)
             else:
                 self.logger.warning(f"Warning: Key '{parsed_data_key}' not found in parsed_data.")
         return new_entries, updated_entries
 
+    def _diff_entries_parallel(self, parsed_objects, current_by_name):
+        """
+        Run _diff_entries over shards of parsed_objects in worker processes.
+
+        Args:
+            parsed_objects: Parsed objects of one type.
+            current_by_name: Current SCM objects of that type keyed by name.
+
+        Returns:
+            Tuple of new objects and updated objects, in the order of parsed_objects.
+        """
+        workers = os.cpu_count() or 1
+        if workers < 2:
+            # Starting and feeding a single worker process only adds cost to the in-process compare
+            return _diff_entries(parsed_objects, current_by_name)
+        shard_size = -(-len(parsed_objects) // workers)
+        shards = [parsed_objects[i:i + shard_size] for i in range(0, len(parsed_objects), shard_size)]
+        self.logger.info(f"Comparing {len(parsed_objects)} objects across {len(shards)} processes.")
+        new, updated = [], []
+        # Spawn rather than fork: the API session and thread pools are live in this process
+        context = multiprocessing.get_context('spawn')
+        root = logging.getLogger()
+        log_queue = context.Queue()
+        listener = logging.handlers.QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+        listener.start()
+        try:
+            with ProcessPoolExecutor(max_workers=len(shards), mp_context=context, initializer=_init_compare_worker, initargs=(log_queue, root.getEffectiveLevel())) as executor:
+                for shard_new, shard_updated in executor.map(_diff_entries, shards, [current_by_name] * len(shards)):
+                    new.extend(shard_new)
+                    updated.extend(shard_updated)
+        finally:
+            listener.stop()
+        return new, updated
+
     @staticmethod
     def needs_update(new_object, current_object):
         """
@@ -371,77 +663,61 @@ class SCMObjectManager:
             logging.warning(f"Object '{new_object['name']}' not found in current set.")
             return False
 
-        def deep_compare(value1, value2):
-            # If one is an empty list/dict and the other is None (or not present), treat them as equal
-            if (value1 == [] and value2 is None) or (value1 is None and value2 == []):
-                return False
-            if value1 is None and value2 is None:
-                return False  # Both are None, no change
-            if value1 is None or value2 is None:
-                return True   # One is None, the other isn't, change detected
-            if isinstance(value1, dict) and isinstance(value2, dict):
-                for key in value1:
-                    if key not in value2:
-                        logging.info(f"Key '{key}' found in SCM object but not in existing object.")
-                        return True
-                    if deep_compare(value1[key], value2[key]):
-                        logging.info(f"Difference detected in dict at key '{key}'")
-                        return True
-                return False
-            elif isinstance(value1, list) and isinstance(value2, list):
-                if len(value1) != len(value2):
-                    logging.info(f"Difference detected in list length. SCM: {len(value1)}, Existing: {len(value2)}")
-                    return True
-                for item1, item2 in zip(value1, value2):
-                    if isinstance(item1, dict) and isinstance(item2, dict):
-                        if deep_compare(item1, item2):
-                            return True
-                    elif item1 != item2:
-                        logging.info(f"Difference detected in list item. SCM: {item1}, Existing: {item2}")
-                        return True
-                return False
-            else:
-                if value1 != value2:
-                    logging.info(f"Difference detected in value. SCM: {value1}, Existing: {value2}")
-                    return True
-                return False
+        # Fast path: values that are already equal can never differ under _deep_differs,
+        # so the common "nothing changed" case is settled by C-level comparisons alone
+        if all(value == current_object.get(key) for key, value in new_object.items() if key != 'name'):
+            logging.debug("No changes detected for object '%s'.", new_object['name'])
+            return False
 
         for key, value in new_object.items():
             if key == 'name':
                 continue
             existing_value = current_object.get(key)
             try:
-                if deep_compare(value, existing_value):
+                if _deep_differs(value, existing_value):
                     logging.info(f"Change detected for '{key}' in object '{new_object['name']}'.")
                     return True
             except Exception as e:
                 logging.error(f"Error comparing '{key}' in '{new_object['name']}': {e}")
 
-        logging.debug(f"No changes detected for object '{new_object['name']}'.")
+        logging.debug("No changes detected for object '%s'.", new_object['name'])
         return False
 
     def update_existing_entries(self, updated_entries, folder_scope, device_group_name):
+        jobs = []
         for obj_type in self.obj_types:
             entry_type_name = obj_type.__name__
             if entry_type_name in updated_entries:
                 entries = updated_entries[entry_type_name]
                 if entries:
                     entry_class = getattr(self.obj, entry_type_name)
+                    base = _clean_endpoint(entry_class)
                     for entry in entries:
                         object_id = entry.get('id')
                         if not object_id:
                             self.logger.warning(f"Warning: Object ID not found for {entry['name']} in {entry_type_name}. Skipping update.")
                             continue
-                        endpoint = entry_class.get_endpoint().replace('?','') + '/' + object_id
+                        endpoint = f"{base}/{object_id}"
                         self.logger.info(f"Updating {entry_type_name}: {entry['name']} at endpoint: {endpoint}")
-                        result = self.api_handler.put(endpoint, entry)
-                        if result['status'] == 'success':
-                            self.logger.info(f"Updated {entry_type_name}: {entry['name']}")
-                        else:
-                            self.logger.error(f"Failed to update {entry_type_name}: {entry['name']}, Reason: {result['message']}")
+                        jobs.append((endpoint, entry, entry_type_name))
                 else:
                     self.logger.info(f"No entries to update for {entry_type_name}.")
 
+        # Updates are independent of each other, so fan them out like creates
+        executor = self.configure.get_executor()
+        futures = {executor.submit(self.api_handler.put, endpoint, entry): (entry, entry_type_name) for endpoint, entry, entry_type_name in jobs}
+        for future in as_completed(futures):
+            entry, entry_type_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                self.logger.error(f"Failed to update {entry_type_name}: {entry['name']}, Reason: {e}")
+                continue
+            if result['status'] == 'success':
+                self.logger.info(f"Updated {entry_type_name}: {entry['name']}")
+            else:
+                self.logger.error(f"Failed to update {entry_type_name}: {entry['name']}, Reason: {result['message']}")
+
     def _generate_key_name(self, entry_type_name):
         """
         Generate a standardized key name based on the entry type name.
@@ -482,12 +758,11 @@ class SCMObjectManager:
             xml_file_path: Path to the XML file containing security rules.
             limit: Limit for fetching security rules.
         """
-        pre_rules = self.fetch_rules(sec_obj, limit, position='pre')
-        post_rules = self.fetch_rules(sec_obj, limit, position='post')
-        current_rules_pre = [rule for rule in pre_rules if rule['folder'] == self.folder_scope]
-        current_rules_post = [rule for rule in post_rules if rule['folder'] == self.folder_scope]
-        current_rule_names_pre = set(rule['name'] for rule in current_rules_pre)
-        current_rule_names_post = set(rule['name'] for rule in current_rules_post)
+        pre_rules, post_rules = self.fetch_pre_and_post_rules(sec_obj, limit)
+        current_rules_pre = _folder_rules(pre_rules, self.folder_scope)
+        current_rules_post = _folder_rules(post_rules, self.folder_scope)
+        current_rule_names_pre = {rule['name'] for rule in current_rules_pre}
+        current_rule_names_post = {rule['name'] for rule in current_rules_post}
         security_rule_pre_entries = parsed_data['security_pre_rules']
         security_rule_post_entries = parsed_data['security_post_rules']
         rules_to_create_pre = [rule for rule in security_rule_pre_entries if rule['name'] not in current_rule_names_pre]
@@ -511,12 +786,11 @@ class SCMObjectManager:
         self.reorder_rules_if_needed(sec_obj, security_rule_post_entries, current_rules_post, api_handler, position='post')
 
     def process_nat_rules(self, api_handler, nat_obj, parsed_data, xml_file_path, limit='10000'):
-        pre_nat_rules = self.fetch_rules(nat_obj, limit, position='pre')
-        post_nat_rules = self.fetch_rules(nat_obj, limit, position='post')
-        current_nat_rules_pre = [rule for rule in pre_nat_rules if rule['folder'] == self.folder_scope]
-        current_nat_rules_post = [rule for rule in post_nat_rules if rule['folder'] == self.folder_scope]
-        current_nat_rule_names_pre = set(rule['name'] for rule in current_nat_rules_pre)
-        current_nat_rule_names_post = set(rule['name'] for rule in current_nat_rules_post)
+        pre_nat_rules, post_nat_rules = self.fetch_pre_and_post_rules(nat_obj, limit)
+        current_nat_rules_pre = _folder_rules(pre_nat_rules, self.folder_scope)
+        current_nat_rules_post = _folder_rules(post_nat_rules, self.folder_scope)
+        current_nat_rule_names_pre = {rule['name'] for rule in current_nat_rules_pre}
+        current_nat_rule_names_post = {rule['name'] for rule in current_nat_rules_post}
         nat_rule_pre_entries = parsed_data['nat_pre_rules']
         nat_rule_post_entries = parsed_data['nat_post_rules']
         rules_to_create_pre = [rule for rule in nat_rule_pre_entries if rule['name'] not in current_nat_rule_names_pre]
@@ -552,5 +826,4 @@ class SCMObjectManager:
         """
         api_handler = api_handler
         if not RuleProcessor.is_rule_order_correct(current_rules, security_rule_entries):
-            self.configure.set_max_workers(4)
             self.configure.check_and_reorder_rules(sec_obj, self.folder_scope, security_rule_entries, limit='10000', position=position)
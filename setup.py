@@ -30,6 +30,9 @@ setup(
         "requests-oauthlib==1.3.1",
         "urllib3==1.26.12",
     ],
+    extras_require={
+        "speedups": ["orjson", "brotli"],
+    },
     classifiers=[
         # Choose appropriate classifiers
         "Development Status :: 4 - Beta",